@@ -0,0 +1,217 @@
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+DATE_TOLERANCE_DAYS = 2
+AMOUNT_TOLERANCE = 1.0
+
+DATE_FORMATS = ["%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%Y-%m-%d"]
+
+# Words that describe the payment rail rather than the merchant
+RAIL_WORDS = {'upi', 'neft', 'imps', 'rtgs', 'pos', 'ach', 'nach', 'ecs', 'si', 'debit', 'credit',
+              'dr', 'cr', 'to', 'from', 'by', 'ref', 'txn', 'payment', 'p', 'vpa', 'mb', 'ib'}
+
+# Rail words like NEFT/IMPS are left out, salary and rent travel on them too
+TRANSFER_KEYWORDS = ['transfer', 'self', 'own account', 'credit card payment', 'cc payment',
+                     'card payment', 'payment received', 'autopay', 'bill desk', 'billdesk']
+
+@lru_cache(maxsize=65536)
+def normalize_description(desc):
+    """Lowercase description with masked digits, numbers and punctuation removed"""
+    desc = (desc or '').lower()
+    desc = re.sub(r'[\d*]+', ' ', desc)
+    desc = re.sub(r'[^a-z ]', ' ', desc)
+    return ' '.join(desc.split())
+
+def merchant_key(desc):
+    """Stable merchant key: normalized description without payment-rail noise"""
+    tokens = [t for t in normalize_description(desc).split() if t not in RAIL_WORDS and len(t) > 1]
+    return ' '.join(tokens[:3])
+
+@lru_cache(maxsize=65536)
+def parse_date(value):
+    """Parse a statement date string, returns None if unknown"""
+    if not value:
+        return None
+    value = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def make_fingerprint(transaction):
+    """Exact fingerprint: normalized description, amount, type and date"""
+    date = parse_date(transaction.get('date'))
+    return (
+        normalize_description(transaction.get('desc')),
+        round(float(transaction.get('amount', 0)), 2),
+        transaction.get('type'),
+        date.isoformat() if date else ''
+    )
+
+def _comparable(transaction):
+    """Only rows with a known statement and date can be matched across statements"""
+    return bool(transaction.get('source')) and parse_date(transaction.get('date')) is not None
+
+def _from_other_source(a, b):
+    """Two rows can only match if they come from different statements"""
+    return a.get('source') != b.get('source')
+
+def _own_bucket(amount, date, amount_tolerance, date_tolerance):
+    """(amount, day) bucket a transaction is stored under"""
+    amount_bucket = int(amount // amount_tolerance) if amount_tolerance else round(amount * 100)
+    return amount_bucket, date.toordinal() // (date_tolerance + 1)
+
+def _bucket_keys(amount, date, amount_tolerance, date_tolerance):
+    """Own and neighbouring buckets that may hold a match within tolerance"""
+    amount_bucket, day_bucket = _own_bucket(amount, date, amount_tolerance, date_tolerance)
+    amount_range = range(amount_bucket - 1, amount_bucket + 2) if amount_tolerance else [amount_bucket]
+    day_range = range(day_bucket - 1, day_bucket + 2)
+    for a in amount_range:
+        for d in day_range:
+            yield a, d
+
+def _within_tolerance(amount_a, date_a, amount_b, date_b, amount_tolerance, date_tolerance):
+    return abs(amount_a - amount_b) <= amount_tolerance and abs(date_a - date_b) <= timedelta(days=date_tolerance)
+
+def _find_original(trans, fingerprint, date, transactions, exact_index, fuzzy_index, matched_originals,
+                   amount_tolerance, date_tolerance):
+    """Index of an unmatched earlier row this one repeats, or None"""
+    desc, amount, trans_type, _ = fingerprint
+
+    for j in exact_index.get(fingerprint, []):
+        if j not in matched_originals and _from_other_source(trans, transactions[j]):
+            return j
+
+    for bucket in _bucket_keys(amount, date, amount_tolerance, date_tolerance):
+        for j in fuzzy_index.get((desc, trans_type) + bucket, []):
+            other = transactions[j]
+            if j in matched_originals or not _from_other_source(trans, other):
+                continue
+            if _within_tolerance(amount, date, round(float(other.get('amount', 0)), 2),
+                                 parse_date(other.get('date')), amount_tolerance, date_tolerance):
+                return j
+    return None
+
+def find_duplicates(transactions, amount_tolerance=AMOUNT_TOLERANCE, date_tolerance=DATE_TOLERANCE_DAYS,
+                    new_from=0):
+    """Find rows repeated across overlapping statements in a single O(n) pass.
+
+    Exact repeats are looked up by fingerprint, near repeats (small amount or
+    date drift) through a bucketed index keyed by description, type, amount
+    and day, so only neighbouring buckets are compared. Rows without a date
+    or source are never matched. Only rows at index >= new_from are reported
+    as duplicates, so stored history before it always survives.
+    Returns a list of (duplicate_index, original_index) pairs.
+    """
+    exact_index = {}
+    fuzzy_index = {}
+    matched_originals = set()
+    duplicates = []
+
+    for i, trans in enumerate(transactions):
+        if not _comparable(trans):
+            continue
+        fingerprint = make_fingerprint(trans)
+        date = parse_date(trans.get('date'))
+
+        if i >= new_from:
+            original = _find_original(trans, fingerprint, date, transactions, exact_index, fuzzy_index,
+                                      matched_originals, amount_tolerance, date_tolerance)
+            if original is not None:
+                matched_originals.add(original)
+                duplicates.append((i, original))
+                continue
+
+        exact_index.setdefault(fingerprint, []).append(i)
+        bucket = _own_bucket(fingerprint[1], date, amount_tolerance, date_tolerance)
+        fuzzy_index.setdefault((fingerprint[0], fingerprint[2]) + bucket, []).append(i)
+
+    return duplicates
+
+def flag_transfers(transactions, amount_tolerance=AMOUNT_TOLERANCE, date_tolerance=DATE_TOLERANCE_DAYS):
+    """Mark debit/credit pairs that move money between our own accounts.
+
+    A pair is a debit and a credit of the same amount within the date
+    tolerance, from different statements, where both sides look like a
+    transfer (card payment / payment received, self transfer, ...).
+    Both sides get ``transfer: True``. Returns the number of pairs flagged.
+    """
+    def candidate(trans):
+        return _comparable(trans) and _looks_like_transfer(trans) and not trans.get('transfer')
+
+    debit_index = {}
+    for i, trans in enumerate(transactions):
+        if trans.get('type') == 'Debit' and candidate(trans):
+            amount = round(float(trans.get('amount', 0)), 2)
+            date = parse_date(trans.get('date'))
+            debit_index.setdefault(_own_bucket(amount, date, amount_tolerance, date_tolerance), []).append(i)
+
+    pairs = 0
+    for trans in transactions:
+        if trans.get('type') != 'Credit' or not candidate(trans):
+            continue
+        amount = round(float(trans.get('amount', 0)), 2)
+        date = parse_date(trans.get('date'))
+
+        match = None
+        for bucket in _bucket_keys(amount, date, amount_tolerance, date_tolerance):
+            for j in debit_index.get(bucket, []):
+                debit = transactions[j]
+                if debit.get('transfer') or not _from_other_source(trans, debit):
+                    continue
+                if _within_tolerance(amount, date, round(float(debit.get('amount', 0)), 2),
+                                     parse_date(debit.get('date')), amount_tolerance, date_tolerance):
+                    match = debit
+                    break
+            if match is not None:
+                break
+
+        if match is not None:
+            trans['transfer'] = True
+            match['transfer'] = True
+            pairs += 1
+
+    return pairs
+
+def _looks_like_transfer(transaction):
+    desc = (transaction.get('desc') or '').lower()
+    return any(keyword in desc for keyword in TRANSFER_KEYWORDS)
+
+def merge_new_transactions(history, transactions, amount_tolerance=AMOUNT_TOLERANCE,
+                           date_tolerance=DATE_TOLERANCE_DAYS):
+    """Rows of a new statement that are not already in the stored history.
+
+    History rows are never dropped. Own-account transfers across history and
+    the new rows are flagged in place.
+    """
+    combined = history + transactions
+    duplicates = find_duplicates(combined, amount_tolerance, date_tolerance, new_from=len(history))
+    duplicate_indices = {i for i, _ in duplicates}
+    new = [combined[i] for i in range(len(history), len(combined)) if i not in duplicate_indices]
+
+    transfers = flag_transfers(history + new, amount_tolerance, date_tolerance)
+
+    print(f"🧹 Skipped {len(duplicates)} duplicate transactions, flagged {transfers} transfers")
+    return new
+
+def add_statement(history, transactions, source, amount_tolerance=AMOUNT_TOLERANCE,
+                  date_tolerance=DATE_TOLERANCE_DAYS):
+    """Merge one statement into the history, returns (kept, new).
+
+    Rows without a source are tagged with source. History rows from the same
+    statement(s) are left out of kept, so reading a statement again replaces
+    its rows instead of adding them twice. new holds the statement rows that
+    are not already in kept; the updated history is kept + new.
+    """
+    for trans in transactions:
+        if not trans.get('source'):
+            trans['source'] = source
+    sources = {trans['source'] for trans in transactions}
+
+    kept = [trans for trans in history if trans.get('source') not in sources]
+    if len(kept) < len(history):
+        print(f"♻️ Replacing {len(history) - len(kept)} rows from an earlier read of this statement")
+    return kept, merge_new_transactions(kept, transactions, amount_tolerance, date_tolerance)
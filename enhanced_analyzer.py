@@ -2,6 +2,8 @@ import json
 import matplotlib.pyplot as plt
 import pandas as pd
 from datetime import datetime
+from recurring_detector import detect_recurring, state_file_for
+from transaction_search import TransactionIndex
 
 def load_categorized_data(filename="categorized_transactions.json"):
     """Load categorized transaction data"""
@@ -14,6 +16,8 @@ def load_categorized_data(filename="categorized_transactions.json"):
 
 def create_enhanced_dashboard(categorized_transactions):
     """Create comprehensive dashboard with categorized data"""
+    # Own-account transfers are not spend
+    categorized_transactions = [trans for trans in categorized_transactions if not trans.get('transfer')]
     if not categorized_transactions:
         return
     
@@ -85,11 +89,20 @@ def generate_detailed_report(categorized_transactions):
     print("\n📋 DETAILED EXPENSE REPORT")
     print("=" * 60)
     
+    # Own-account transfers are not spend
+    transfers = [trans for trans in categorized_transactions if trans.get('transfer')]
+    categorized_transactions = [trans for trans in categorized_transactions if not trans.get('transfer')]
+    if not categorized_transactions:
+        print("❌ No transactions left after excluding transfers.")
+        return
+    
     total_amount = sum(trans['amount'] for trans in categorized_transactions)
     verified_count = sum(1 for trans in categorized_transactions if trans['verified'])
     
     print(f"📊 Total Transactions: {len(categorized_transactions)}")
     print(f"💰 Total Amount: ₹{total_amount:.2f}")
+    if transfers:
+        print(f"🔁 Excluded Transfers: {len(transfers)} (₹{sum(t['amount'] for t in transfers):.2f})")
     print(f"✅ Verified: {verified_count}/{len(categorized_transactions)} ({verified_count/len(categorized_transactions)*100:.1f}%)")
     
     # Category breakdown
@@ -126,31 +139,32 @@ def generate_detailed_report(categorized_transactions):
 
 def export_to_csv(categorized_transactions, filename="expense_report.csv"):
     """Export categorized data to CSV"""
-    df = pd.DataFrame(categorized_transactions)
+    # Own-account transfers are not spend
+    df = pd.DataFrame([trans for trans in categorized_transactions if not trans.get('transfer')])
     df.to_csv(filename, index=False)
     print(f"📄 Exported to {filename}")
 
-def find_miscategorized(categorized_transactions):
+# Audit queries for obvious mismatches, the first matching rule wins
+MISCATEGORIZATION_RULES = [
+    ("merchant contains zomato AND category != Food", "Should be Food"),
+    ("merchant contains swiggy AND category != Food", "Should be Food"),
+    ("merchant contains netflix AND category != Entertainment", "Should be Entertainment"),
+    ("merchant contains spotify AND category != Entertainment", "Should be Entertainment"),
+    ("merchant contains rent AND category != Rent", "Should be Rent"),
+]
+
+def find_miscategorized(categorized_transactions, index=None):
     """Find potentially miscategorized transactions"""
     print("\n🔍 POTENTIAL MISCATEGORIZATIONS")
     print("=" * 50)
     
-    suspicious = []
+    index = index or TransactionIndex(categorized_transactions)
+    flagged = {}
+    for query, suggestion in MISCATEGORIZATION_RULES:
+        for i in index.query(query):
+            flagged.setdefault(i, suggestion)
     
-    for trans in categorized_transactions:
-        desc = trans['desc'].lower()
-        category = trans['category']
-        
-        # Check for obvious mismatches
-        if 'zomato' in desc or 'swiggy' in desc:
-            if category != 'Food':
-                suspicious.append((trans, 'Should be Food'))
-        elif 'netflix' in desc or 'spotify' in desc:
-            if category != 'Entertainment':
-                suspicious.append((trans, 'Should be Entertainment'))
-        elif 'rent' in desc:
-            if category != 'Rent':
-                suspicious.append((trans, 'Should be Rent'))
+    suspicious = [(categorized_transactions[i], flagged[i]) for i in sorted(flagged)]
     
     if suspicious:
         print(f"Found {len(suspicious)} potentially miscategorized transactions:")
@@ -161,8 +175,28 @@ def find_miscategorized(categorized_transactions):
     else:
         print("✅ No obvious miscategorizations found!")
 
+def show_recurring_payments(categorized_transactions, state_file=None):
+    """Show detected subscriptions, EMIs, rent and SIPs"""
+    print("\n🔁 RECURRING PAYMENTS")
+    print("=" * 50)
+    
+    recurring = detect_recurring(categorized_transactions, state_file=state_file)
+    if not recurring:
+        print("No recurring payments detected (needs dated transactions across a few months).")
+        return recurring
+    
+    monthly_days = 30
+    monthly_total = sum(r['amount'] * monthly_days / r['interval_days'] for r in recurring)
+    print(f"Found {len(recurring)} recurring payments, ≈ ₹{monthly_total:.2f}/month:")
+    for r in recurring:
+        print(f"  🔁 ₹{r['amount']:>8.2f} {r['period']:<9} {r['kind']:<12} - {r['desc'][:35]}...")
+        print(f"     {r['occurrences']} charges, last on {r['last_date']}")
+    
+    return recurring
+
 def main():
-    categorized_transactions = load_categorized_data()
+    data_file = "categorized_transactions.json"
+    categorized_transactions = load_categorized_data(data_file)
     if not categorized_transactions:
         return
     
@@ -177,6 +211,9 @@ def main():
     # Find potential issues
     find_miscategorized(categorized_transactions)
     
+    # Subscriptions, EMIs, rent and SIPs
+    show_recurring_payments(categorized_transactions, state_file=state_file_for(data_file))
+    
     # Export to CSV
     export_to_csv(categorized_transactions)
 
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Local Expense Analysis Service
+
+Keeps libraries, HTTP sessions and every user's transaction history warm in
+memory and runs statement/report jobs from a queue on a worker pool.
+
+    python expense_service.py --port 8765 --workers 4
+
+    POST /jobs        {"type": "statement", "user": "asha", "pdf_path": "...", "password": "..."}
+                      {"type": "statement", "user": "asha", "transactions": [...], "source": "..."}
+                      {"type": "report", "user": "asha"}
+    GET  /jobs        all jobs with status
+    GET  /jobs/<id>   status, result or error of one job
+    GET  /health
+
+Submitting a statement with the same source again replaces its rows. PDF
+jobs default to the file name, transaction rows without a source to one
+per job.
+"""
+
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from deduplicator import add_statement
+from gemini_stream import STREAM_RESPONSES
+from recurring_detector import detect_recurring
+from transaction_categorizer import auto_verify_obvious_transactions, categorize_transactions_batched
+
+DATA_DIR = "service_data"
+DEFAULT_WORKERS = int(os.environ.get("EXPENSE_SERVICE_WORKERS", 4))
+
+jobs = {}
+jobs_lock = threading.Lock()
+job_queue = queue.Queue()
+
+# user -> transaction history, loaded once and kept in memory
+store = {}
+store_locks = {}
+store_lock = threading.Lock()
+
+def user_file(user, suffix=""):
+    """Path of a user's history file inside DATA_DIR"""
+    if not re.fullmatch(r'[\w.-]+', user or ''):
+        raise ValueError(f"Invalid user name: {user!r}")
+    return os.path.join(DATA_DIR, f"{user}{suffix}.json")
+
+def get_history(user):
+    """Return the user's in-memory history and its lock, loading from disk on first use"""
+    with store_lock:
+        if user not in store:
+            try:
+                with open(user_file(user), 'r') as f:
+                    store[user] = json.load(f)
+            except FileNotFoundError:
+                store[user] = []
+            store_locks[user] = threading.Lock()
+        return store[user], store_locks[user]
+
+def save_history(user, transactions):
+    """Persist a user's history, writing to a temp file first"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = user_file(user)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(transactions, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def run_statement_job(payload):
+    """Extract (if needed), deduplicate against history, categorize and store"""
+    user = payload['user']
+    transactions = payload.get('transactions')
+
+    if transactions is None:
+        # PyPDF2 is only needed for PDF jobs
+        from pdf_reader import (extract_json, extract_masked_text_from_pdf, get_transactions_from_ai,
+                                get_transactions_streaming)
+        masked_lines = extract_masked_text_from_pdf(payload['pdf_path'], payload.get('password', ''))
+        if not masked_lines:
+            raise ValueError("Could not read any lines from the PDF")
+        if STREAM_RESPONSES:
+            transactions = get_transactions_streaming(masked_lines)
+        else:
+            transactions = extract_json(get_transactions_from_ai(masked_lines))
+        if not transactions:
+            raise ValueError("Could not parse any transaction")
+
+    # Jobs for the same user run one at a time, other users run in parallel
+    history, lock = get_history(user)
+    with lock:
+        kept, new = add_statement(history, transactions, payload['source'])
+
+        categorized = categorize_transactions_batched(new, verbose=False) if new else []
+        if categorized:
+            auto_verify_obvious_transactions(categorized)
+
+        replaced = len(history) - len(kept)
+        history[:] = kept + categorized
+        save_history(user, history)
+
+    return {
+        'received': len(transactions),
+        'added': len(categorized),
+        'replaced': replaced,
+        'duplicates': len(transactions) - len(new),
+        'history_size': len(history),
+    }
+
+def run_report_job(payload):
+    """Category totals (transfers excluded) and recurring payments for a user"""
+    user = payload['user']
+    history, lock = get_history(user)
+    with lock:
+        transactions = list(history)
+        # The recurring state file is per user, so update it under the user lock
+        recurring = detect_recurring(transactions, state_file=user_file(user, "_recurring"))
+
+    spend = [t for t in transactions if not t.get('transfer')]
+    categories = {}
+    for trans in spend:
+        data = categories.setdefault(trans['category'], {'total': 0, 'count': 0, 'verified': 0})
+        data['total'] += trans['amount']
+        data['count'] += 1
+        if trans['verified']:
+            data['verified'] += 1
+
+    return {
+        'transactions': len(transactions),
+        'transfers': len(transactions) - len(spend),
+        'total_amount': sum(t['amount'] for t in spend),
+        'categories': categories,
+        'recurring': recurring,
+    }
+
+JOB_TYPES = {
+    'statement': run_statement_job,
+    'report': run_report_job,
+}
+
+def submit_job(payload):
+    """Validate and queue a job, returns its id"""
+    if payload.get('type') not in JOB_TYPES:
+        raise ValueError(f"Unknown job type, expected one of: {', '.join(JOB_TYPES)}")
+    user_file(payload.get('user'))
+    if payload['type'] == 'statement' and 'transactions' not in payload and 'pdf_path' not in payload:
+        raise ValueError("Statement jobs need 'transactions' or 'pdf_path'")
+
+    job_id = uuid.uuid4().hex[:12]
+    if payload['type'] == 'statement' and not payload.get('source'):
+        # Names the statement, so sending it again replaces its rows
+        payload['source'] = os.path.basename(payload['pdf_path']) if 'pdf_path' in payload else f"upload-{job_id}"
+    with jobs_lock:
+        jobs[job_id] = {
+            'id': job_id,
+            'type': payload['type'],
+            'user': payload['user'],
+            'status': 'queued',
+            'submitted': datetime.now().isoformat(timespec='seconds'),
+        }
+    job_queue.put((job_id, payload))
+    return job_id
+
+def worker_loop():
+    """Drain the job queue forever"""
+    while True:
+        job_id, payload = job_queue.get()
+        with jobs_lock:
+            jobs[job_id]['status'] = 'running'
+        try:
+            result = JOB_TYPES[payload['type']](payload)
+            update = {'status': 'done', 'result': result}
+        except Exception as e:
+            update = {'status': 'failed', 'error': str(e)}
+        update['finished'] = datetime.now().isoformat(timespec='seconds')
+        with jobs_lock:
+            jobs[job_id].update(update)
+        job_queue.task_done()
+
+def start_workers(count=DEFAULT_WORKERS):
+    """Start the worker pool"""
+    for _ in range(count):
+        threading.Thread(target=worker_loop, daemon=True).start()
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    def send_json(self, status, body):
+        data = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {'status': 'ok', 'queued': job_queue.qsize(), 'users': len(store)})
+        elif self.path == "/jobs":
+            with jobs_lock:
+                summary = [{k: v for k, v in job.items() if k != 'result'} for job in jobs.values()]
+            self.send_json(200, summary)
+        elif self.path.startswith("/jobs/"):
+            with jobs_lock:
+                job = jobs.get(self.path[len("/jobs/"):])
+                job = dict(job) if job else None
+            if job:
+                self.send_json(200, job)
+            else:
+                self.send_json(404, {'error': 'Job not found'})
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self.send_json(404, {'error': 'Not found'})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            job_id = submit_job(payload)
+        except (ValueError, AttributeError) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(202, {'job_id': job_id, 'status': 'queued'})
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the expense analyzer as a local service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    start_workers(args.workers)
+    server = ThreadingHTTPServer((args.host, args.port), ServiceHandler)
+    print(f"🏦 Expense service on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
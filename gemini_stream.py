@@ -0,0 +1,131 @@
+import json
+import os
+import re
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+# Point at a local stub server for testing, e.g. http://127.0.0.1:8080/v1beta
+GEMINI_API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = "gemini-1.5-flash"
+STREAM_RESPONSES = os.environ.get("GEMINI_STREAMING", "").lower() in ("1", "true", "yes")
+
+session = requests.Session()
+
+class JsonArrayStream:
+    """Incremental parser for a JSON array of objects that arrives in chunks.
+
+    feed() returns each object as soon as its closing brace arrives, so a
+    truncated reply still yields every complete object before the cut.
+    Anything before the opening '[' (markdown fences, chatter) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.item_start = None
+
+    def feed(self, text):
+        self.buffer += text
+        items = []
+
+        while self.pos < len(self.buffer) and not self.finished:
+            ch = self.buffer[self.pos]
+            if not self.started:
+                self.started = ch == "["
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                if self.depth == 0:
+                    self.item_start = self.pos
+                self.depth += 1
+            elif ch in "}]":
+                if self.depth == 0:
+                    self.finished = ch == "]"
+                else:
+                    self.depth -= 1
+                    if self.depth == 0:
+                        item = decode_item(self.buffer[self.item_start:self.pos + 1])
+                        if isinstance(item, dict):
+                            items.append(item)
+                        self.item_start = None
+            self.pos += 1
+
+        # Drop text that has been fully consumed
+        cut = self.item_start if self.item_start is not None else self.pos
+        self.buffer = self.buffer[cut:]
+        self.pos -= cut
+        if self.item_start is not None:
+            self.item_start = 0
+        return items
+
+def decode_item(text):
+    """Decode one array element, returns None if it is malformed"""
+    # Fix bad backslashes
+    text = re.sub(r'\\(?!["\\/bfnrtu])', r'\\\\', text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+def stream_generate(prompt, base_url=GEMINI_API_BASE, model=GEMINI_MODEL, api_key=GEMINI_API_KEY):
+    """Yield text chunks from Gemini's streaming endpoint (server-sent events)"""
+    headers = {
+        "Content-Type": "application/json",
+        "X-goog-api-key": api_key
+    }
+
+    data = {
+        "contents": [{"parts": [{"text": prompt}]}]
+    }
+
+    response = session.post(
+        f"{base_url}/models/{model}:streamGenerateContent?alt=sse",
+        headers=headers,
+        json=data,
+        stream=True
+    )
+    response.raise_for_status()
+
+    with response:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            chunk = json.loads(line[len("data:"):])
+            for candidate in chunk.get('candidates', [])[:1]:
+                for part in candidate.get('content', {}).get('parts', []):
+                    if 'text' in part:
+                        yield part['text']
+
+def stream_json_items(prompt, on_item=None, base_url=GEMINI_API_BASE, model=GEMINI_MODEL, api_key=GEMINI_API_KEY):
+    """Stream a JSON array reply, returns (items, complete).
+
+    on_item(item) is called for each object as soon as it is parsed.
+    complete is False if the reply was cut off before the closing ']'.
+    """
+    parser = JsonArrayStream()
+    items = []
+
+    try:
+        for chunk in stream_generate(prompt, base_url, model, api_key):
+            for item in parser.feed(chunk):
+                items.append(item)
+                if on_item:
+                    on_item(item)
+    except Exception as e:
+        print(f"⚠️ Stream interrupted after {len(items)} items: {e}")
+
+    return items, parser.finished
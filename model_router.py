@@ -0,0 +1,266 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from gemini_stream import GEMINI_API_BASE, GEMINI_API_KEY, GEMINI_MODEL, JsonArrayStream, session, stream_json_items
+
+HF_BASE_URL = os.environ.get("HF_BASE_URL", "https://router.huggingface.co/featherless-ai/v1")
+HF_MODEL = os.environ.get("HF_MODEL", "mistralai/Mistral-7B-Instruct-v0.1")
+HF_TOKEN = os.environ.get("HF_TOKEN")
+
+# Comma-separated provider names in preference order
+MODEL_PROVIDERS = os.environ.get("MODEL_PROVIDERS", "gemini,hf" if HF_TOKEN else "gemini")
+HEDGING = os.environ.get("MODEL_HEDGING", "1").lower() in ("1", "true", "yes")
+# Hedge delay before a provider has enough samples for a p95
+HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", 10.0))
+# Never hedge sooner than this, even for very fast providers
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", 1.0))
+REQUEST_TIMEOUT = float(os.environ.get("MODEL_REQUEST_TIMEOUT", 120.0))
+# Prompts in flight at once: concurrent batches per job times service workers
+MAX_IN_FLIGHT = int(os.environ.get("MODEL_MAX_IN_FLIGHT", int(os.environ.get("CATEGORIZE_CONCURRENCY", 4))
+                                   * int(os.environ.get("EXPENSE_SERVICE_WORKERS", 4))))
+# How often to check whether a queued primary call has started
+START_POLL_INTERVAL = 0.05
+
+LATENCY_WINDOW = 100
+MIN_SAMPLES = 5
+# Providers failing more often than this drop to the back of the ranking
+MAX_ERROR_RATE = 0.5
+
+class GeminiProvider:
+    """Gemini generateContent REST API"""
+
+    def __init__(self, name="gemini", model=GEMINI_MODEL, base_url=GEMINI_API_BASE, api_key=GEMINI_API_KEY):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+
+    def generate(self, prompt, timeout=REQUEST_TIMEOUT):
+        headers = {
+            "Content-Type": "application/json",
+            "X-goog-api-key": self.api_key
+        }
+
+        data = {
+            "contents": [{"parts": [{"text": prompt}]}]
+        }
+
+        response = session.post(
+            f"{self.base_url}/models/{self.model}:generateContent",
+            headers=headers,
+            json=data,
+            timeout=timeout
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result['candidates'][0]['content']['parts'][0]['text']
+
+    def stream_items(self, prompt, on_item=None):
+        return stream_json_items(prompt, on_item, self.base_url, self.model, self.api_key)
+
+class OpenAICompatibleProvider:
+    """Chat completions on an OpenAI-compatible endpoint such as the Hugging Face router"""
+
+    def __init__(self, name, model, base_url, api_key):
+        # Only needed when an OpenAI-compatible provider is configured
+        from openai import OpenAI
+        self.name = name
+        self.model = model
+        self.client = OpenAI(base_url=base_url, api_key=api_key, max_retries=0)
+
+    def generate(self, prompt, timeout=REQUEST_TIMEOUT):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=timeout
+        )
+        return response.choices[0].message.content
+
+class ProviderStats:
+    """Rolling latency and error window for one provider"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+
+    def percentile(self, q):
+        """Latency percentile of successful calls, None until MIN_SAMPLES exist"""
+        with self.lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self):
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def summary(self):
+        return {'p50': self.percentile(0.5), 'p95': self.percentile(0.95), 'error_rate': self.error_rate}
+
+class ModelRouter:
+    """Sends prompts to the fastest healthy provider and hedges slow requests.
+
+    If the chosen provider has not answered by its own p95 latency, the same
+    prompt goes to the next provider and whichever valid reply arrives first
+    wins. The hedge timer starts when the call starts running, not while it
+    waits for a pool thread. Failed or invalid replies fail over to the next
+    provider.
+    """
+
+    def __init__(self, providers, hedging=HEDGING, hedge_default=HEDGE_DEFAULT_DELAY,
+                 hedge_min=HEDGE_MIN_DELAY, timeout=REQUEST_TIMEOUT, max_in_flight=MAX_IN_FLIGHT):
+        if not providers:
+            raise ValueError("At least one provider is required")
+        self.providers = providers
+        self.stats = {p.name: ProviderStats() for p in providers}
+        self.hedging = hedging
+        self.hedge_default = hedge_default
+        self.hedge_min = hedge_min
+        self.timeout = timeout
+        # Every in-flight prompt may end up hedged across all providers
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight * len(providers))
+
+    def ranked(self):
+        """Healthy providers by p50 latency, unmeasured ones first so they get sampled"""
+        def key(item):
+            order, provider = item
+            stats = self.stats[provider.name]
+            return stats.error_rate > MAX_ERROR_RATE, stats.percentile(0.5) or 0, order
+        return [p for _, p in sorted(enumerate(self.providers), key=key)]
+
+    def hedge_delay(self, provider):
+        p95 = self.stats[provider.name].percentile(0.95)
+        return max(self.hedge_min, p95) if p95 is not None else self.hedge_default
+
+    def _call(self, provider, prompt, validate, started=None):
+        start = time.monotonic()
+        if started is not None:
+            started[provider.name] = start
+        try:
+            text = provider.generate(prompt, timeout=self.timeout)
+            if validate and not validate(text):
+                raise ValueError("invalid response")
+        except Exception:
+            self.stats[provider.name].record(time.monotonic() - start, False)
+            raise
+        self.stats[provider.name].record(time.monotonic() - start, True)
+        return text
+
+    def generate(self, prompt, validate=None):
+        """Return the first valid reply text, raises RuntimeError if every provider fails"""
+        ranked = self.ranked()
+        backups = iter(ranked[1:])
+        running = {}
+        started = {}
+        errors = []
+
+        def launch(provider):
+            running[self.executor.submit(self._call, provider, prompt, validate, started)] = provider
+
+        launch(ranked[0])
+        hedge_delay = self.hedge_delay(ranked[0]) if self.hedging and len(ranked) > 1 else None
+
+        while running:
+            if hedge_delay is None:
+                timeout = None
+            elif ranked[0].name in started:
+                timeout = max(0, started[ranked[0].name] + hedge_delay - time.monotonic())
+            else:
+                # Still queued behind other prompts, the hedge clock has not started
+                timeout = START_POLL_INTERVAL
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Woken by the start poll rather than the hedge deadline
+                if ranked[0].name not in started or time.monotonic() < started[ranked[0].name] + hedge_delay:
+                    continue
+                # Slower than its p95, race a second provider
+                hedge_delay = None
+                provider = next(backups, None)
+                if provider:
+                    print(f"⏱️ {ranked[0].name} slower than usual, hedging with {provider.name}")
+                    launch(provider)
+                continue
+
+            for future in done:
+                provider = running.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}")
+
+            if not running:
+                provider = next(backups, None)
+                if provider:
+                    hedge_delay = None
+                    launch(provider)
+
+        raise RuntimeError(f"All providers failed ({'; '.join(errors)})")
+
+    def stream_items(self, prompt, on_item=None):
+        """Stream a JSON array reply from the first provider that yields anything.
+
+        Returns (items, complete) like stream_json_items. Providers without a
+        streaming API answer in one piece and their array is parsed whole.
+        Streams are not hedged, a second stream would emit the same rows twice.
+        """
+        for provider in self.ranked():
+            start = time.monotonic()
+            try:
+                if hasattr(provider, 'stream_items'):
+                    items, complete = provider.stream_items(prompt, on_item)
+                else:
+                    parser = JsonArrayStream()
+                    items = parser.feed(provider.generate(prompt, timeout=self.timeout))
+                    complete = parser.finished
+                    for item in items:
+                        if on_item:
+                            on_item(item)
+            except Exception as e:
+                print(f"⚠️ {provider.name} failed: {e}")
+                items, complete = [], False
+
+            ok = bool(items) or complete
+            self.stats[provider.name].record(time.monotonic() - start, ok)
+            if ok:
+                return items, complete
+
+        return [], False
+
+def load_providers(names=MODEL_PROVIDERS):
+    """Build providers from a comma-separated list of names"""
+    registry = {
+        'gemini': lambda: GeminiProvider(),
+        'hf': lambda: OpenAICompatibleProvider("hf", HF_MODEL, HF_BASE_URL, HF_TOKEN),
+    }
+    providers = []
+    for name in names.split(","):
+        name = name.strip()
+        if name not in registry:
+            raise ValueError(f"Unknown provider {name!r}, expected one of: {', '.join(registry)}")
+        providers.append(registry[name]())
+    return providers
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_router():
+    """Shared router built from the environment on first use"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter(load_providers())
+        return _router
@@ -3,10 +3,11 @@ import re
 import os
 import json
 from dotenv import load_dotenv
-import requests
+from deduplicator import add_statement
+from gemini_stream import STREAM_RESPONSES
+from model_router import get_router
 
 load_dotenv()
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
 # 🔐 Mask long digits (like account no, UPI IDs)
 def mask_sensitive_digits(text):
@@ -35,13 +36,17 @@ def extract_masked_text_from_pdf(pdf_path, password):
         print(f"❌ Error reading PDF: {e}")
         return []
 
-# 🤖 Send to Gemini API
-def get_transactions_from_ai(masked_lines):
+# Attempts to finish a truncated streaming reply
+MAX_STREAM_ATTEMPTS = 3
+
+# 📝 Build extraction prompt
+def build_extraction_prompt(masked_lines):
     text_content = '\n'.join(masked_lines)
-    prompt = f"""
+    return f"""
 Extract all bank transactions from the following lines and return only valid JSON list. 
 
 Each item should include:
+- date (as printed on the statement)
 - desc
 - type (Credit/Debit)
 - amount
@@ -52,34 +57,43 @@ Text:
 {text_content}
 """
 
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": GEMINI_API_KEY
-    }
-
-    data = {
-        "contents": [
-            {
-                "parts": [{"text": prompt}]
-            }
-        ]
-    }
+# 🤖 Send to Gemini API
+def get_transactions_from_ai(masked_lines):
+    prompt = build_extraction_prompt(masked_lines)
 
     try:
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            headers=headers,
-            json=data
-        )
-        response.raise_for_status()
-        result = response.json()
-        model_output = result['candidates'][0]['content']['parts'][0]['text']
-        print("🧠 Gemini Output:\n", model_output)
+        model_output = get_router().generate(prompt, validate=lambda text: "[" in text)
+        print("🧠 Model Output:\n", model_output)
         return model_output
     except Exception as e:
         print(f"❌ API error: {e}")
         return ""
 
+# 🌊 Stream through the model router, keeping everything parsed before a cut-off
+# (extraction still returns all rows at the end; streaming here is for truncation recovery)
+def get_transactions_streaming(masked_lines, on_item=None):
+    prompt = build_extraction_prompt(masked_lines)
+    transactions = []
+
+    for _ in range(MAX_STREAM_ATTEMPTS):
+        if transactions:
+            # Only ask for what is missing after the last complete item
+            request_prompt = prompt + f"""
+You already returned the first {len(transactions)} transactions, the last one was:
+{json.dumps(transactions[-1])}
+Return only the transactions after that one, as a JSON array.
+"""
+        else:
+            request_prompt = prompt
+
+        items, complete = get_router().stream_items(request_prompt, on_item)
+        transactions.extend(items)
+        if complete:
+            break
+        print(f"⚠️ Reply cut off after {len(transactions)} transactions, requesting the rest...")
+
+    return transactions
+
 # 🧪 Try extracting JSON
 def extract_json(response_text):
     try:
@@ -106,21 +120,38 @@ def save_to_json(data, filename="output.json"):
         json.dump(data, f, indent=2)
     print(f"✅ Saved {len(data)} transactions to {filename}")
 
+# 📚 Add a statement to the stored history, skipping rows seen in overlapping statements
+def append_to_history(transactions, source, filename="output.json"):
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        history = []
+
+    # Re-reading the same PDF replaces its rows instead of adding them twice
+    kept, new = add_statement(history, transactions, source)
+    save_to_json(kept + new, filename)
+
 # 🚀 Main logic
-def process_pdf_and_send(pdf_path, password):
+def process_pdf_and_send(pdf_path, password, stream=STREAM_RESPONSES):
     print("🔍 Reading and masking PDF...")
     masked_lines = extract_masked_text_from_pdf(pdf_path, password)
     if not masked_lines:
         return
 
-    print("🚀 Sending to Gemini API...")
-    response = get_transactions_from_ai(masked_lines)
-    if not response:
-        return
+    if stream:
+        print("🌊 Streaming from Gemini API...")
+        transactions = get_transactions_streaming(masked_lines)
+    else:
+        print("🚀 Sending to Gemini API...")
+        response = get_transactions_from_ai(masked_lines)
+        if not response:
+            return
 
-    transactions = extract_json(response)
+        transactions = extract_json(response)
     if transactions:
-        save_to_json(transactions)
+        # Tag the statement so overlapping downloads can be deduplicated
+        append_to_history(transactions, os.path.basename(pdf_path))
     else:
         print("❌ Couldn’t parse any transaction.")
 
@@ -0,0 +1,56 @@
+import math
+import os
+import threading
+
+# Rough average for English/transaction text on Gemini-style tokenizers
+CHARS_PER_TOKEN = 4
+
+TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", 4000))
+MIN_TOKEN_BUDGET = 500
+MAX_TOKEN_BUDGET = int(os.environ.get("PROMPT_MAX_TOKEN_BUDGET", 16000))
+TARGET_LATENCY = float(os.environ.get("PROMPT_TARGET_LATENCY", 8.0))
+
+def estimate_tokens(text):
+    """Cheap token estimate from character count"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + 1
+
+class AdaptiveBatcher:
+    """Packs prompt items under a token budget that adapts to how the API behaves.
+
+    Failed batches halve the budget, slow or partially answered batches
+    shrink it by a quarter and fast ones grow it by a quarter, always within
+    [min_budget, max_budget].
+    Safe to share between threads.
+    """
+
+    def __init__(self, token_budget=TOKEN_BUDGET, min_budget=MIN_TOKEN_BUDGET,
+                 max_budget=MAX_TOKEN_BUDGET, target_latency=TARGET_LATENCY):
+        self.token_budget = token_budget
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        self.target_latency = target_latency
+        self.lock = threading.Lock()
+
+    def take(self, pending, costs, overhead=0):
+        """Pop indices from the front of the pending deque until the budget is full.
+
+        Always takes at least one item so an oversized row still gets sent.
+        """
+        with self.lock:
+            budget = self.token_budget
+        indices = [pending.popleft()]
+        used = overhead + costs[indices[0]]
+        while pending and used + costs[pending[0]] <= budget:
+            used += costs[pending[0]]
+            indices.append(pending.popleft())
+        return indices
+
+    def record(self, latency, ok, degraded=False):
+        """Adjust the budget after a batch finishes, degraded means only part of it was answered"""
+        with self.lock:
+            if not ok:
+                self.token_budget = max(self.min_budget, self.token_budget // 2)
+            elif degraded or latency > self.target_latency:
+                self.token_budget = max(self.min_budget, int(self.token_budget * 0.75))
+            elif latency < self.target_latency / 2:
+                self.token_budget = min(self.max_budget, int(self.token_budget * 1.25))
@@ -0,0 +1,173 @@
+import json
+import os
+import pandas as pd
+from deduplicator import merchant_key, parse_date
+
+MIN_OCCURRENCES = 3
+MAX_AMOUNT_CV = 0.10
+MAX_INTERVAL_CV = 0.25
+
+PERIODS = [("Weekly", 7), ("Monthly", 30), ("Quarterly", 91), ("Yearly", 365)]
+
+KIND_KEYWORDS = {
+    'EMI': ['emi', 'loan', 'bajaj', 'finance'],
+    'Rent': ['rent', 'rentomojo', 'landlord'],
+    'SIP': ['sip', 'mutual', 'mf', 'zerodha', 'groww', 'coin'],
+    'Subscription': ['netflix', 'spotify', 'prime', 'hotstar', 'youtube', 'apple', 'google', 'jio', 'airtel'],
+}
+
+STAT_FIELDS = ['count', 'amount_sum', 'amount_sq_sum', 'interval_count', 'interval_sum',
+               'interval_sq_sum', 'first_day', 'last_day']
+
+def _to_frame(transactions):
+    """Dated debits as a DataFrame of (key, desc, amount, day)"""
+    rows = []
+    for trans in transactions:
+        if trans.get('type') != 'Debit' or trans.get('transfer'):
+            continue
+        date = parse_date(trans.get('date'))
+        key = merchant_key(trans.get('desc'))
+        if date and key:
+            rows.append({'key': key, 'desc': trans['desc'], 'amount': float(trans['amount']), 'day': date.toordinal()})
+    return pd.DataFrame(rows, columns=['key', 'desc', 'amount', 'day'])
+
+def compute_group_stats(df):
+    """Per-merchant running sums, computed with one groupby over the whole frame"""
+    if df.empty:
+        return pd.DataFrame(columns=STAT_FIELDS + ['desc'])
+
+    df = df.sort_values(['key', 'day'])
+    df['interval'] = df.groupby('key')['day'].diff()
+    df['amount_sq'] = df['amount'] ** 2
+    df['interval_sq'] = df['interval'] ** 2
+
+    grouped = df.groupby('key')
+    stats = pd.DataFrame({
+        'count': grouped['amount'].size(),
+        'amount_sum': grouped['amount'].sum(),
+        'amount_sq_sum': grouped['amount_sq'].sum(),
+        'interval_count': grouped['interval'].count(),
+        'interval_sum': grouped['interval'].sum(),
+        'interval_sq_sum': grouped['interval_sq'].sum(),
+        'first_day': grouped['day'].min(),
+        'last_day': grouped['day'].max(),
+        'desc': grouped['desc'].last(),
+    })
+    return stats
+
+def merge_stats(old, new):
+    """Fold stats for newly arrived transactions into the saved stats"""
+    if old.empty:
+        return new
+    if new.empty:
+        return old
+
+    both = old.index.intersection(new.index)
+    merged = pd.concat([old.drop(both), new.drop(both)])
+
+    if len(both):
+        o, n = old.loc[both], new.loc[both]
+        # Gap between the last saved charge and the first new one
+        gap = n['first_day'] - o['last_day']
+        combined = pd.DataFrame({
+            'count': o['count'] + n['count'],
+            'amount_sum': o['amount_sum'] + n['amount_sum'],
+            'amount_sq_sum': o['amount_sq_sum'] + n['amount_sq_sum'],
+            'interval_count': o['interval_count'] + n['interval_count'] + 1,
+            'interval_sum': o['interval_sum'] + n['interval_sum'] + gap,
+            'interval_sq_sum': o['interval_sq_sum'] + n['interval_sq_sum'] + gap ** 2,
+            'first_day': o['first_day'],
+            'last_day': n['last_day'],
+            'desc': n['desc'],
+        })
+        merged = pd.concat([merged, combined])
+
+    return merged
+
+def classify_recurring(stats):
+    """Vectorized amount/interval stability test, returns recurring merchants only"""
+    if stats.empty:
+        return []
+
+    mean_amount = stats['amount_sum'] / stats['count']
+    amount_var = (stats['amount_sq_sum'] / stats['count'] - mean_amount ** 2).clip(lower=0)
+    amount_cv = amount_var ** 0.5 / mean_amount
+
+    intervals = stats['interval_count'].where(stats['interval_count'] > 0)
+    mean_interval = stats['interval_sum'] / intervals
+    interval_var = (stats['interval_sq_sum'] / intervals - mean_interval ** 2).clip(lower=0)
+    interval_cv = interval_var ** 0.5 / mean_interval
+
+    mask = ((stats['count'] >= MIN_OCCURRENCES) & (amount_cv <= MAX_AMOUNT_CV)
+            & (interval_cv <= MAX_INTERVAL_CV) & (mean_interval >= 5))
+
+    recurring = []
+    for key in stats.index[mask]:
+        period = min(PERIODS, key=lambda p: abs(p[1] - mean_interval[key]))[0]
+        recurring.append({
+            'merchant': key,
+            'desc': stats.at[key, 'desc'],
+            'kind': _recurring_kind(key),
+            'period': period,
+            'amount': round(float(mean_amount[key]), 2),
+            'interval_days': round(float(mean_interval[key]), 1),
+            'occurrences': int(stats.at[key, 'count']),
+            'last_date': pd.Timestamp.fromordinal(int(stats.at[key, 'last_day'])).strftime('%Y-%m-%d'),
+        })
+    return sorted(recurring, key=lambda r: r['amount'], reverse=True)
+
+def _recurring_kind(key):
+    for kind, keywords in KIND_KEYWORDS.items():
+        if any(word in key.split() for word in keywords):
+            return kind
+    return 'Recurring'
+
+def state_file_for(data_file):
+    """State file kept next to the history it was built from, e.g. history_recurring.json"""
+    return os.path.splitext(data_file)[0] + "_recurring.json"
+
+def load_state(filename):
+    """Load saved per-merchant stats"""
+    try:
+        with open(filename, 'r') as f:
+            return pd.DataFrame.from_dict(json.load(f), orient='index')
+    except FileNotFoundError:
+        return pd.DataFrame(columns=STAT_FIELDS + ['desc'])
+
+def save_state(stats, filename):
+    """Save per-merchant stats so the next statement only adds its own rows"""
+    # Write to a temp file first so a crash never leaves a half-written state
+    with open(filename + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(stats.to_dict(orient='index'), f, indent=2, default=float)
+    os.replace(filename + ".tmp", filename)
+
+def detect_recurring(transactions, state_file=None):
+    """Detect subscriptions, EMIs, rent and SIPs across the saved history.
+
+    transactions must be the full history that state_file belongs to (use
+    state_file_for). Only transactions newer than each merchant's last saved
+    charge are aggregated, so re-running on a new statement costs O(new rows).
+    If a merchant's rows up to its last saved charge no longer add up to the
+    saved count, total and first day (a late statement arrived, or rows were
+    replaced or removed), that merchant is rebuilt from the rows it has now.
+    Without a state_file everything is computed from scratch.
+    """
+    state = load_state(state_file) if state_file else pd.DataFrame(columns=STAT_FIELDS + ['desc'])
+    df = _to_frame(transactions)
+
+    if not state.empty:
+        last_day = df['key'].map(state['last_day'])
+        seen = last_day.notna() & (df['day'] <= last_day)
+        seen_stats = df[seen].groupby('key').agg(count=('amount', 'size'), amount_sum=('amount', 'sum'),
+                                                 first_day=('day', 'min')).reindex(state.index)
+        stale = state.index[(seen_stats['count'].fillna(0) != state['count'])
+                            | ((seen_stats['amount_sum'] - state['amount_sum']).abs() > 0.005)
+                            | (seen_stats['first_day'] != state['first_day'])]
+        state = state.drop(stale)
+        df = df[~seen | df['key'].isin(stale)]
+
+    stats = merge_stats(state, compute_group_stats(df))
+    if state_file:
+        save_state(stats, state_file)
+
+    return classify_recurring(stats)
@@ -0,0 +1,137 @@
+"""
+Streaming parser and truncation recovery against a local stub server.
+
+Run from the repository root: python -m unittest discover tests
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import transaction_categorizer
+from gemini_stream import JsonArrayStream
+from model_router import GeminiProvider, ModelRouter
+
+class StubGemini(BaseHTTPRequestHandler):
+    """Streams a categorization reply in small SSE chunks, cut in half on the first call"""
+    calls = []
+    # Seconds between chunks and when each reply finished sending
+    delay = 0
+    closed = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['contents'][0]['parts'][0]['text']
+        lines = [line for line in prompt.splitlines() if line[:1].isdigit()]
+        reply = json.dumps([{"index": int(line.split('.')[0]), "category": "Food"} for line in lines])
+
+        StubGemini.calls.append(len(lines))
+        if len(StubGemini.calls) == 1:
+            reply = "```json\n" + reply[:len(reply) // 2]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for i in range(0, len(reply), 7):
+            chunk = {'candidates': [{'content': {'parts': [{'text': reply[i:i + 7]}]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(StubGemini.delay)
+        StubGemini.closed.append(time.monotonic())
+
+class JsonArrayStreamTest(unittest.TestCase):
+    def feed_in_chunks(self, text, size):
+        parser = JsonArrayStream()
+        items = []
+        for i in range(0, len(text), size):
+            items.extend(parser.feed(text[i:i + size]))
+        return parser, items
+
+    def test_objects_split_across_chunks(self):
+        text = 'Here you go:\n```json\n[{"desc": "A \\"quoted\\" [x]", "amount": 1}, {"desc": "B}", "amount": 2}]\n```'
+        for size in (1, 3, 17, len(text)):
+            parser, items = self.feed_in_chunks(text, size)
+            self.assertTrue(parser.finished)
+            self.assertEqual(items, [{"desc": 'A "quoted" [x]', "amount": 1}, {"desc": "B}", "amount": 2}])
+
+    def test_truncated_tail_keeps_complete_objects(self):
+        parser, items = self.feed_in_chunks('[{"index": 1}, {"index": 2}, {"ind', 5)
+        self.assertFalse(parser.finished)
+        self.assertEqual(items, [{"index": 1}, {"index": 2}])
+
+    def test_malformed_object_is_skipped(self):
+        parser, items = self.feed_in_chunks('[{"index": 1,}, {"index": 2}]', 4)
+        self.assertTrue(parser.finished)
+        self.assertEqual(items, [{"index": 2}])
+
+class TruncationRetryTest(unittest.TestCase):
+    def setUp(self):
+        StubGemini.calls = []
+        StubGemini.delay = 0
+        StubGemini.closed = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubGemini)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        provider = GeminiProvider(base_url=f"http://127.0.0.1:{self.server.server_port}/v1beta", api_key="test")
+        self.router = ModelRouter([provider])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.router.executor.shutdown()
+
+    def test_only_missing_rows_are_requested_again(self):
+        transactions = [{"desc": f"SHOP {i}", "amount": i, "type": "Debit"} for i in range(20)]
+        arrived = []
+
+        with mock.patch.object(transaction_categorizer, "get_router", lambda: self.router):
+            categorizations = transaction_categorizer.request_categorizations_streaming(
+                transactions, on_item=lambda index, category: arrived.append(index))
+
+        self.assertEqual(sorted(categorizations), list(range(1, 21)))
+        # Every row delivered exactly once, the retry only carried the rows lost to the cut
+        self.assertEqual(sorted(arrived), list(range(1, 21)))
+        self.assertEqual(len(StubGemini.calls), 2)
+        self.assertEqual(StubGemini.calls[0], 20)
+        self.assertTrue(0 < StubGemini.calls[1] < 20)
+
+    def test_rows_arrive_before_the_stream_closes(self):
+        StubGemini.delay = 0.02
+        transactions = [{"desc": f"SHOP {i}", "amount": i, "type": "Debit"} for i in range(5)]
+        arrived = []
+
+        with mock.patch.object(transaction_categorizer, "get_router", lambda: self.router):
+            transaction_categorizer.request_categorizations_streaming(
+                transactions, on_item=lambda index, category: arrived.append(time.monotonic()))
+
+        self.assertEqual(len(arrived), 5)
+        self.assertLess(arrived[0], StubGemini.closed[0])
+
+    def test_batched_rows_stream_to_on_batch_once(self):
+        StubGemini.delay = 0.005
+        transactions = [{"desc": f"SHOP {i}", "amount": i, "type": "Debit"} for i in range(30)]
+        delivered = []
+        first_arrival = []
+
+        def on_batch(indices, batch):
+            first_arrival.append(time.monotonic())
+            delivered.append(indices)
+
+        with mock.patch.object(transaction_categorizer, "get_router", lambda: self.router), \
+                mock.patch.object(transaction_categorizer, "STREAM_RESPONSES", True):
+            categorized = transaction_categorizer.categorize_transactions_batched(
+                transactions, on_batch=on_batch, verbose=False)
+
+        self.assertEqual(sorted(i for indices in delivered for i in indices), list(range(30)))
+        # Streamed rows reach review one at a time while the reply is still coming in
+        self.assertTrue(all(len(indices) == 1 for indices in delivered))
+        self.assertLess(first_arrival[0], min(StubGemini.closed))
+        self.assertTrue(all(trans['category'] == "Food" for trans in categorized))
+
+if __name__ == "__main__":
+    unittest.main()
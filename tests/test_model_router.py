@@ -0,0 +1,140 @@
+"""
+Hedging, failover and streaming fallback of the model router against local stub servers.
+
+Run from the repository root: python -m unittest discover tests
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from model_router import GeminiProvider, ModelRouter, OpenAICompatibleProvider
+
+class StubModel(BaseHTTPRequestHandler):
+    """Answers Gemini (plain and SSE) and chat completion requests with the server's reply"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.paths.append(self.path)
+        time.sleep(self.server.delay)
+
+        if self.server.status != 200:
+            self.send_json({'error': 'stub failure'})
+        elif ":streamGenerateContent" in self.path:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i in range(0, len(self.server.reply), 5):
+                chunk = {'candidates': [{'content': {'parts': [{'text': self.server.reply[i:i + 5]}]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        elif self.path.endswith("/chat/completions"):
+            self.send_json({'id': 'stub', 'object': 'chat.completion', 'created': 0, 'model': 'stub',
+                            'choices': [{'index': 0, 'finish_reason': 'stop',
+                                         'message': {'role': 'assistant', 'content': self.server.reply}}]})
+        else:
+            self.send_json({'candidates': [{'content': {'parts': [{'text': self.server.reply}]}}]})
+
+    def send_json(self, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class RouterTest(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+        self.routers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        for router in self.routers:
+            router.executor.shutdown()
+
+    def stub(self, reply='[{"index": 1}]', delay=0, status=200):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubModel)
+        server.reply, server.delay, server.status, server.paths = reply, delay, status, []
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        self.servers.append(server)
+        return server
+
+    def gemini(self, name, server):
+        return GeminiProvider(name, base_url=f"http://127.0.0.1:{server.server_port}/v1beta", api_key="test")
+
+    def router(self, providers, **options):
+        router = ModelRouter(providers, max_in_flight=2, **options)
+        self.routers.append(router)
+        return router
+
+    def test_hedges_after_primary_p95(self):
+        slow, fast = self.stub(reply="slow", delay=1), self.stub(reply="fast")
+        router = self.router([self.gemini("slow", slow), self.gemini("fast", fast)],
+                             hedge_default=30, hedge_min=0.2)
+        # slow ranks first with a p95 of 0.05s, so it is hedged at hedge_min instead of hedge_default
+        for _ in range(5):
+            router.stats["slow"].record(0.05, True)
+            router.stats["fast"].record(0.1, True)
+
+        start = time.monotonic()
+        self.assertEqual(router.generate("prompt"), "fast")
+        elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(len(slow.paths), 1)
+
+    def test_fails_over_on_error(self):
+        broken, healthy = self.stub(status=500), self.stub(reply="ok")
+        router = self.router([self.gemini("broken", broken), self.gemini("healthy", healthy)], hedging=False)
+
+        self.assertEqual(router.generate("prompt"), "ok")
+        self.assertEqual(router.stats["broken"].error_rate, 1.0)
+
+    def test_fails_over_on_invalid_reply(self):
+        chatty, healthy = self.stub(reply="Sorry, I can't help."), self.stub(reply="[]")
+        router = self.router([self.gemini("chatty", chatty), self.gemini("healthy", healthy)], hedging=False)
+
+        self.assertEqual(router.generate("prompt", validate=lambda text: "[" in text), "[]")
+        self.assertEqual(len(chatty.paths), 1)
+        self.assertEqual(router.stats["chatty"].error_rate, 1.0)
+
+    def test_raises_when_every_provider_fails(self):
+        router = self.router([self.gemini("a", self.stub(status=500)), self.gemini("b", self.stub(status=503))],
+                             hedging=False)
+        with self.assertRaises(RuntimeError):
+            router.generate("prompt")
+
+    def test_stream_items_uses_the_provider_endpoint(self):
+        server = self.stub(reply='```json\n[{"index": 1}, {"index": 2}]\n```')
+        arrived = []
+
+        items, complete = self.router([self.gemini("gemini", server)]).stream_items("prompt", arrived.append)
+
+        self.assertTrue(complete)
+        self.assertEqual(items, [{"index": 1}, {"index": 2}])
+        self.assertEqual(arrived, items)
+        self.assertIn(":streamGenerateContent", server.paths[0])
+
+    def test_stream_items_falls_back_to_provider_without_streaming(self):
+        broken, chat = self.stub(status=500), self.stub(reply='[{"index": 1}, {"index": 2}, {"ind')
+        plain = OpenAICompatibleProvider("chat", "stub", f"http://127.0.0.1:{chat.server_port}/v1", "test")
+        self.assertFalse(hasattr(plain, "stream_items"))
+        arrived = []
+
+        items, complete = self.router([self.gemini("gemini", broken), plain]).stream_items("prompt", arrived.append)
+
+        # The cut-off reply keeps its complete objects and reports it was truncated
+        self.assertFalse(complete)
+        self.assertEqual(items, [{"index": 1}, {"index": 2}])
+        self.assertEqual(arrived, items)
+        self.assertEqual(chat.paths, ["/v1/chat/completions"])
+
+if __name__ == "__main__":
+    unittest.main()
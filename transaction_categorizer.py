@@ -1,23 +1,38 @@
 import json
 import os
-import requests
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
+from deduplicator import make_fingerprint, merchant_key
+from gemini_stream import STREAM_RESPONSES
+from model_router import get_router
+from prompt_batcher import AdaptiveBatcher, estimate_tokens
 
 load_dotenv()
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
 CATEGORIES = ["Food", "Travel", "Rent", "Shopping", "Income", "Bills", "Entertainment", "Other"]
 
-def categorize_transactions_with_ai(transactions):
-    """Use AI to categorize all transactions together"""
-    print(f"🤖 Sending {len(transactions)} transactions to AI for categorization...")
-    
-    # Prepare transactions for AI
-    transactions_text = []
-    for i, trans in enumerate(transactions):
-        transactions_text.append(f"{i+1}. {trans['desc']} | Amount: {trans['amount']} | Type: {trans['type']}")
+# Concurrent AI requests when categorizing in batches
+MAX_CONCURRENT_BATCHES = int(os.environ.get("CATEGORIZE_CONCURRENCY", 4))
+# Attempts per batch before falling back to rules
+MAX_BATCH_ATTEMPTS = 3
+# Expected reply size per row, e.g. {"index": 12, "category": "Food"},
+OUTPUT_TOKENS_PER_TRANSACTION = 12
+
+batcher = AdaptiveBatcher()
+
+def format_transaction_line(number, trans):
+    """One numbered prompt line for a transaction"""
+    return f"{number}. {trans.get('desc', '')} | Amount: {trans.get('amount', 0)} | Type: {trans.get('type', '')}"
+
+def build_categorization_prompt(transactions):
+    """Build the categorization prompt, rows numbered 1..n"""
+    transactions_text = [format_transaction_line(i+1, trans) for i, trans in enumerate(transactions)]
     
-    prompt = f"""
+    return f"""
 Categorize each transaction into one of these categories: {', '.join(CATEGORIES)}
 
 Return a JSON array where each object has:
@@ -29,50 +44,90 @@ Transactions:
 
 Return only the JSON array, no explanation.
 """
+
+def request_categorizations(transactions, verbose=True, stream=STREAM_RESPONSES, on_item=None):
+    """Send one categorization prompt, returns {index: category}.
+
+    When streaming, on_item(index, category) is called as each row arrives.
+    """
+    if stream:
+        return request_categorizations_streaming(transactions, on_item)
     
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": GEMINI_API_KEY
-    }
-    
-    data = {
-        "contents": [{"parts": [{"text": prompt}]}]
-    }
+    # Replies without a usable JSON array count as failures so the router fails over
+    ai_output = get_router().generate(
+        build_categorization_prompt(transactions),
+        validate=lambda text: bool(parse_ai_categorization(text, len(transactions), verbose=False))
+    )
     
-    try:
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
-            headers=headers,
-            json=data
-        )
-        response.raise_for_status()
-        result = response.json()
-        ai_output = result['candidates'][0]['content']['parts'][0]['text']
-        
+    if verbose:
         print("🧠 AI Categorization Response:")
         print(ai_output)
+    
+    return parse_ai_categorization(ai_output, len(transactions), verbose)
+
+def request_categorizations_streaming(transactions, on_item=None):
+    """Stream categorizations, re-requesting only rows missing after a cut-off reply.
+
+    on_item(index, category) is called as each categorization arrives.
+    """
+    categorizations = {}
+    missing = list(range(1, len(transactions) + 1))
+    
+    def receiver(prompt_rows):
+        """Callback for one attempt, prompt_rows maps its 1..m numbering back"""
+        def receive(item):
+            parsed = valid_categorization(item, len(prompt_rows))
+            if parsed is None or prompt_rows[parsed[0] - 1] in categorizations:
+                return
+            index, category = prompt_rows[parsed[0] - 1], parsed[1]
+            categorizations[index] = category
+            if on_item:
+                on_item(index, category)
+        return receive
+    
+    for _ in range(MAX_BATCH_ATTEMPTS):
+        # The retry prompt numbers the missing rows 1..m
+        subset = [transactions[i - 1] for i in missing]
+        _, complete = get_router().stream_items(build_categorization_prompt(subset), receiver(missing))
         
-        # Parse AI response
-        categorizations = parse_ai_categorization(ai_output, len(transactions))
-        
-        # Apply categorizations
-        categorized = []
-        for i, transaction in enumerate(transactions):
-            category = categorizations.get(i+1, fallback_categorize(transaction))
-            categorized.append({
-                **transaction,
-                "category": category,
-                "verified": False
-            })
-        
-        return categorized
-        
-    except Exception as e:
-        print(f"⚠️ AI categorization failed: {e}")
-        print("🔄 Using fallback categorization...")
-        return fallback_categorize_all(transactions)
+        missing = [i for i in missing if i not in categorizations]
+        if complete or not missing:
+            break
+    
+    return categorizations
+
+def apply_categorizations(transactions, categorizations):
+    """Attach categories by 1-based prompt index, falling back to rules for gaps"""
+    categorized = []
+    for i, transaction in enumerate(transactions):
+        category = categorizations.get(i+1, fallback_categorize(transaction))
+        categorized.append({
+            **transaction,
+            "category": category,
+            "verified": False
+        })
+    return categorized
+
+def valid_categorization(item, expected_count):
+    """(index, category) from one parsed reply object, None if it is unusable"""
+    index = item.get('index')
+    category = item.get('category')
+    
+    # Indexes outside this prompt would land on the wrong transaction
+    if isinstance(index, int) and 1 <= index <= expected_count and category in CATEGORIES:
+        return index, category
+    return None
+
+def collect_categorizations(items, expected_count):
+    """Convert parsed reply objects to {index: category}, dropping invalid ones"""
+    categorizations = {}
+    for item in items:
+        parsed = valid_categorization(item, expected_count)
+        if parsed:
+            categorizations[parsed[0]] = parsed[1]
+    return categorizations
 
-def parse_ai_categorization(ai_output, expected_count):
+def parse_ai_categorization(ai_output, expected_count, verbose=True):
     """Parse AI categorization response"""
     import re
     
@@ -84,27 +139,106 @@ def parse_ai_categorization(ai_output, expected_count):
             raise ValueError("No JSON array found")
         
         json_str = ai_output[start_idx:end_idx]
-        categorizations_list = json.loads(json_str)
+        categorizations = collect_categorizations(json.loads(json_str), expected_count)
         
-        # Convert to dict for easy lookup
-        categorizations = {}
-        for item in categorizations_list:
-            index = item.get('index')
-            category = item.get('category')
-            
-            if index and category in CATEGORIES:
-                categorizations[index] = category
-        
-        print(f"✅ Parsed {len(categorizations)}/{expected_count} categorizations")
+        if verbose:
+            print(f"✅ Parsed {len(categorizations)}/{expected_count} categorizations")
         return categorizations
         
     except Exception as e:
-        print(f"❌ Failed to parse AI categorization: {e}")
+        if verbose:
+            print(f"❌ Failed to parse AI categorization: {e}")
         return {}
 
+def _timed_request(transactions, on_item=None):
+    """Run one batch request, returns (categorizations, seconds, error)"""
+    start = time.monotonic()
+    try:
+        categorizations = request_categorizations(transactions, verbose=False, stream=STREAM_RESPONSES, on_item=on_item)
+        return categorizations, time.monotonic() - start, None
+    except Exception as e:
+        return {}, time.monotonic() - start, e
+
+def categorize_transactions_batched(transactions, on_batch=None, max_workers=MAX_CONCURRENT_BATCHES, verbose=True):
+    """Categorize in token-budgeted batches sent concurrently.
+
+    Each prompt numbers its own rows 1..n and replies are mapped back through
+    that batch's list of original indices. Rows a reply left out (the whole
+    batch if it failed) are re-packed under the (now smaller) budget and
+    retried, and only fall back to rules after MAX_BATCH_ATTEMPTS.
+    on_batch(indices, categorized) is called as each batch completes. With
+    streaming on, rows are handed to on_batch one by one as they arrive and
+    the batch end only delivers the rows that fell back to rules.
+    """
+    costs = [estimate_tokens(format_transaction_line(len(transactions), trans)) + OUTPUT_TOKENS_PER_TRANSACTION
+             for trans in transactions]
+    overhead = estimate_tokens(build_categorization_prompt([]))
+    
+    pending = deque(range(len(transactions)))
+    attempts = [0] * len(transactions)
+    categorized = [None] * len(transactions)
+    batches = 0
+    failed = 0
+    partial = 0
+    streamed = set()
+    streamed_lock = threading.Lock()
+    
+    def stream_row(indices):
+        """on_item callback for one batch, runs on a pool thread"""
+        def emit(index, category):
+            i = indices[index - 1]
+            row = {**transactions[i], "category": category, "verified": False}
+            with streamed_lock:
+                # A retried batch streams its rows again
+                if i in streamed:
+                    return
+                categorized[i] = row
+                streamed.add(i)
+            on_batch([i], [row])
+        return emit
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while pending or running:
+            while pending and len(running) < max_workers:
+                indices = batcher.take(pending, costs, overhead)
+                on_item = stream_row(indices) if on_batch and STREAM_RESPONSES else None
+                running[pool.submit(_timed_request, [transactions[i] for i in indices], on_item)] = indices
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                indices = running.pop(future)
+                categorizations, latency, error = future.result()
+                missing = [i for n, i in enumerate(indices, 1) if n not in categorizations]
+                ok = len(missing) < len(indices)
+                batcher.record(latency, ok, degraded=bool(missing))
+                
+                batches += 1
+                failed += not ok
+                partial += ok and bool(missing)
+                # Only the rows left out go back, each row counts its own attempts
+                retry = [i for i in missing if attempts[i] + 1 < MAX_BATCH_ATTEMPTS]
+                for i in retry:
+                    attempts[i] += 1
+                pending.extendleft(reversed(retry))
+                
+                retry = set(retry)
+                batch = apply_categorizations([transactions[i] for i in indices], categorizations)
+                with streamed_lock:
+                    rest = [(i, trans) for i, trans in zip(indices, batch) if i not in streamed and i not in retry]
+                for i, trans in rest:
+                    categorized[i] = trans
+                if on_batch and rest:
+                    on_batch([i for i, _ in rest], [trans for _, trans in rest])
+    
+    if verbose:
+        print(f"🤖 Categorized {len(transactions)} transactions in {batches} batches "
+              f"({failed} failed, {partial} partial, budget now {batcher.token_budget} tokens)")
+    return categorized
+
 def fallback_categorize(transaction):
     """Simple rule-based fallback categorization"""
-    desc = transaction['desc'].lower()
+    desc = (transaction.get('desc') or '').lower()
     
     if any(word in desc for word in ['zomato', 'swiggy', 'food', 'restaurant', 'cafe', 'eatclub']):
         return "Food"
@@ -118,23 +252,11 @@ def fallback_categorize(transaction):
         return "Entertainment"
     elif any(word in desc for word in ['bill', 'charges', 'sms']):
         return "Bills"
-    elif transaction['type'] == 'Credit' and transaction['amount'] > 10000:
+    elif transaction.get('type') == 'Credit' and float(transaction.get('amount', 0)) > 10000:
         return "Income"
     else:
         return "Other"
 
-def fallback_categorize_all(transactions):
-    """Apply fallback categorization to all transactions"""
-    categorized = []
-    for transaction in transactions:
-        category = fallback_categorize(transaction)
-        categorized.append({
-            **transaction,
-            "category": category,
-            "verified": False
-        })
-    return categorized
-
 def show_categorization_results(categorized_transactions):
     """Show AI categorization results in a summary format"""
     print("\n🧠 AI CATEGORIZATION RESULTS")
@@ -162,108 +284,184 @@ def show_categorization_results(categorized_transactions):
         if len(transactions) > 5:
             print(f"  ... and {len(transactions) - 5} more")
 
+OBVIOUS_KEYWORDS = {
+    'Food': ['zomato', 'swiggy', 'zepto', 'eatclub', 'dominos', 'pizza', 'restaurant', 'cafe'],
+    'Travel': ['uber', 'ola', 'taxi', 'fuel', 'petrol', 'diesel', 'metro'],
+    'Entertainment': ['netflix', 'spotify', 'prime', 'hotstar', 'youtube', 'gaming'],
+    'Bills': ['electricity', 'water', 'gas', 'internet', 'mobile', 'recharge', 'jio', 'airtel'],
+    'Rent': ['rent', 'rentomojo', 'rental'],
+    'Shopping': ['amazon', 'flipkart', 'myntra', 'lifestyle', 'shopping', 'envogue']
+}
+
+def is_obvious(transaction):
+    """Check if a categorization is obvious enough to skip review"""
+    desc_lower = transaction['desc'].lower()
+    category = transaction['category']
+    
+    if category in OBVIOUS_KEYWORDS:
+        return any(keyword in desc_lower for keyword in OBVIOUS_KEYWORDS[category])
+    # High-value credits as Income
+    return category == 'Income' and transaction['type'] == 'Credit' and transaction['amount'] > 10000
+
 def auto_verify_obvious_transactions(categorized_transactions):
     """Auto-verify transactions with obvious categorizations"""
-    obvious_keywords = {
-        'Food': ['zomato', 'swiggy', 'zepto', 'eatclub', 'dominos', 'pizza', 'restaurant', 'cafe'],
-        'Travel': ['uber', 'ola', 'taxi', 'fuel', 'petrol', 'diesel', 'metro'],
-        'Entertainment': ['netflix', 'spotify', 'prime', 'hotstar', 'youtube', 'gaming'],
-        'Bills': ['electricity', 'water', 'gas', 'internet', 'mobile', 'recharge', 'jio', 'airtel'],
-        'Rent': ['rent', 'rentomojo', 'rental'],
-        'Shopping': ['amazon', 'flipkart', 'myntra', 'lifestyle', 'shopping', 'envogue']
-    }
-    
     auto_verified = 0
     
     for transaction in categorized_transactions:
-        desc_lower = transaction['desc'].lower()
-        category = transaction['category']
-        
-        # Auto-verify obvious transactions
-        if category != 'Other':
-            if category in obvious_keywords:
-                keywords = obvious_keywords[category]
-                if any(keyword in desc_lower for keyword in keywords):
-                    transaction['verified'] = True
-                    auto_verified += 1
-            # Auto-verify high-value credits as Income
-            elif category == 'Income' and transaction['type'] == 'Credit' and transaction['amount'] > 10000:
-                transaction['verified'] = True
-                auto_verified += 1
+        if is_obvious(transaction):
+            transaction['verified'] = True
+            auto_verified += 1
     
     print(f"✅ Auto-verified {auto_verified} obvious transactions")
     return auto_verified
 
-def review_ambiguous_transactions(categorized_transactions):
-    """Review only ambiguous transactions (unverified ones)"""
-    # Find transactions that need review (unverified ones)
-    needs_review = []
-    for i, trans in enumerate(categorized_transactions):
-        if not trans['verified']:
-            needs_review.append((i, trans))
-    
-    if not needs_review:
-        print("\n✅ All transactions are verified! No review needed.")
-        return 0
-    
-    print(f"\n🔍 REVIEWING {len(needs_review)} AMBIGUOUS TRANSACTIONS")
-    print("=" * 60)
-    print("Only reviewing transactions that need clarification...")
-    
-    corrections = 0
+def add_to_review_queue(pending, transaction):
+    """Queue an unverified transaction under its merchant key"""
+    key = merchant_key(transaction['desc']) or transaction['desc'].lower()
+    pending.setdefault((key, transaction['type']), []).append(transaction)
+
+def pop_highest_impact(pending):
+    """Take the merchant group with the largest total amount"""
+    key = max(pending, key=lambda k: sum(t['amount'] for t in pending[k]))
+    return key, pending.pop(key)
+
+def ask_category(group, position):
+    """Ask once for a merchant group, returns the category or None to skip remaining"""
+    transaction = group[0]
+    print(f"\n📝 [{position}] {transaction['desc']}")
+    if len(group) > 1:
+        print(f"    (+{len(group) - 1} more from the same merchant, total ₹{sum(t['amount'] for t in group):.2f})")
+    print(f"    Amount: ₹{transaction['amount']} | Type: {transaction['type']}")
+    print(f"    🤖 AI Category: {transaction['category']}")
     
-    for review_idx, (original_idx, transaction) in enumerate(needs_review):
-        print(f"\n📝 [{review_idx+1}/{len(needs_review)}] {transaction['desc']}")
-        print(f"    Amount: ₹{transaction['amount']} | Type: {transaction['type']}")
-        print(f"    🤖 AI Category: {transaction['category']}")
+    while True:
+        choice = input("    ❓ Correct? (y/n/s to skip remaining): ").lower().strip()
         
-        while True:
-            choice = input("    ❓ Correct? (y/n/s to skip remaining): ").lower().strip()
+        if choice == 'y':
+            print("    ✅ Verified")
+            return transaction['category']
+        elif choice == 'n':
+            print(f"\n    Available categories: {', '.join(CATEGORIES)}")
+            new_category = input("    Enter correct category: ").strip()
             
-            if choice == 'y':
-                transaction['verified'] = True
-                print("    ✅ Verified")
-                break
-            elif choice == 'n':
-                print(f"\n    Available categories: {', '.join(CATEGORIES)}")
-                new_category = input("    Enter correct category: ").strip()
-                
-                if new_category in CATEGORIES:
-                    old_category = transaction['category']
-                    transaction['category'] = new_category
-                    transaction['verified'] = True
-                    corrections += 1
-                    print(f"    ✅ Changed: {old_category} → {new_category}")
-                    break
-                else:
-                    print("    ❌ Invalid category. Please try again.")
-            elif choice == 's':
-                print("    ⏭️ Skipping remaining reviews...")
-                return corrections
+            if new_category in CATEGORIES:
+                print(f"    ✅ Changed: {transaction['category']} → {new_category}")
+                return new_category
             else:
-                print("    ❌ Please enter 'y', 'n', or 's'")
-    
-    print(f"\n✅ Review complete! Made {corrections} corrections.")
+                print("    ❌ Invalid category. Please try again.")
+        elif choice == 's':
+            print("    ⏭️ Skipping remaining reviews...")
+            return None
+        else:
+            print("    ❌ Please enter 'y', 'n', or 's'")
+
+def apply_category(group, category):
+    """Apply a reviewed category to a merchant group, returns the number of corrections"""
+    corrections = 0
+    for transaction in group:
+        if transaction['category'] != category:
+            transaction['category'] = category
+            corrections += 1
+        transaction['verified'] = True
     return corrections
 
-def review_categorizations(categorized_transactions):
-    """Smart review process - auto-verify obvious, review ambiguous"""
-    # Show AI results first
-    show_categorization_results(categorized_transactions)
+def categorize_in_background(transactions, results):
+    """Categorize with AI and put (indices, batch) on the results queue.
+
+    Always ends with None, or with the exception if categorization failed,
+    so the review loop never waits forever.
+    """
+    error = None
+    try:
+        categorize_transactions_batched(transactions, on_batch=lambda indices, batch: results.put((indices, batch)),
+                                        verbose=False)
+    except Exception as e:
+        error = e
+    finally:
+        results.put(error)
+
+def pipelined_review(transactions):
+    """Categorize in the background while the user reviews what has arrived.
+
+    Prompts start with the first batch, the largest-amount merchant goes
+    first, and each answer covers every pending (and later arriving)
+    transaction from the same merchant. The network is only waited on when
+    there is nothing left to ask. If the AI fails part way, rows that never
+    arrived get rule-based categories and the review carries on.
+    """
+    print(f"🤖 Categorizing {len(transactions)} transactions in background batches...")
+    results = queue.Queue()
+    worker = threading.Thread(target=categorize_in_background, args=(transactions, results), daemon=True)
+    worker.start()
+    
+    categorized = [None] * len(transactions)
+    categorizing = True
+    pending = {}
+    answers = {}
+    auto_verified = 0
+    corrections = 0
+    prompts = 0
+    skipping = False
     
-    # Auto-verify obvious transactions
-    auto_verified = auto_verify_obvious_transactions(categorized_transactions)
+    def receive(i, trans):
+        nonlocal auto_verified
+        categorized[i] = trans
+        if is_obvious(trans):
+            trans['verified'] = True
+            auto_verified += 1
+        else:
+            add_to_review_queue(pending, trans)
+    
+    while categorizing or (pending and not skipping):
+        # Take every batch that has arrived, block only if there is nothing to ask
+        block = not pending or skipping
+        try:
+            while categorizing:
+                item = results.get(block=block)
+                block = False
+                if item is None:
+                    categorizing = False
+                    break
+                if isinstance(item, Exception):
+                    # Keep the answers given so far, rules cover what never arrived
+                    print(f"\n⚠️ AI categorization failed ({item}), using rules for the remaining transactions")
+                    categorizing = False
+                    for i, trans in enumerate(transactions):
+                        if categorized[i] is None:
+                            receive(i, {**trans, "category": fallback_categorize(trans), "verified": False})
+                    break
+                indices, batch = item
+                for i, trans in zip(indices, batch):
+                    receive(i, trans)
+        except queue.Empty:
+            pass
+        
+        # Merchants already answered need no new prompt
+        for key in [k for k in pending if k in answers]:
+            corrections += apply_category(pending.pop(key), answers[key])
+        
+        if skipping or not pending:
+            continue
+        
+        key, group = pop_highest_impact(pending)
+        prompts += 1
+        category = ask_category(group, f"{prompts}, {sum(len(g) for g in pending.values())} queued")
+        if category is None:
+            skipping = True
+            continue
+        answers[key] = category
+        corrections += apply_category(group, category)
     
-    # Review only ambiguous transactions
-    corrections = review_ambiguous_transactions(categorized_transactions)
+    show_categorization_results(categorized)
     
-    total_verified = sum(1 for t in categorized_transactions if t['verified'])
+    total_verified = sum(1 for t in categorized if t['verified'])
     print(f"\n📊 FINAL SUMMARY:")
     print(f"   • Auto-verified: {auto_verified}")
+    print(f"   • Review prompts: {prompts}")
     print(f"   • Manual corrections: {corrections}")
-    print(f"   • Total verified: {total_verified}/{len(categorized_transactions)}")
+    print(f"   • Total verified: {total_verified}/{len(categorized)}")
     
-    return corrections
+    return categorized, corrections
 
 def generate_summary(categorized_transactions):
     """Generate categorization summary"""
@@ -304,6 +502,42 @@ def generate_summary(categorized_transactions):
     
     return summary
 
+def history_key(transaction):
+    """Identity of a stored history row: its fingerprint and statement"""
+    return make_fingerprint(transaction) + (transaction.get('source'),)
+
+def split_uncategorized(history, categorized_transactions):
+    """Pair the statement history with rows categorized on earlier runs.
+
+    Returns (kept, new). kept holds the history rows already categorized,
+    with their category and verification carried over and every other field
+    (e.g. a transfer flag set by a later statement) taken from the history.
+    new holds the history rows still to categorize. Categorized rows whose
+    statement was re-read and replaced in the history are dropped.
+    """
+    done = {}
+    for trans in categorized_transactions:
+        done.setdefault(history_key(trans), deque()).append(trans)
+    
+    kept = []
+    new = []
+    for trans in history:
+        previous = done.get(history_key(trans))
+        if previous:
+            old = previous.popleft()
+            kept.append({**trans, "category": old['category'], "verified": old['verified']})
+        else:
+            new.append(trans)
+    return kept, new
+
+def load_categorized_data(filename="categorized_transactions.json"):
+    """Rows categorized on earlier runs, empty on the first run"""
+    try:
+        with open(filename, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
 def save_categorized_data(categorized_transactions, filename="categorized_transactions.json"):
     """Save categorized transactions to file"""
     with open(filename, 'w', encoding='utf-8') as f:
@@ -319,14 +553,17 @@ def main():
         print("❌ output.json not found. Run pdf_reader.py first.")
         return
     
-    print(f"📄 Loaded {len(transactions)} transactions")
+    # Only rows from statements added since the last run go to the AI and to review
+    kept, new = split_uncategorized(transactions, load_categorized_data())
+    print(f"📄 Loaded {len(transactions)} transactions, {len(new)} not categorized yet")
     
-    # Categorize with AI
-    print("\n🤖 Starting AI categorization...")
-    categorized = categorize_transactions_with_ai(transactions)
-    
-    # Interactive review
-    review_categorizations(categorized)
+    if new:
+        # Categorize with AI in the background while reviewing
+        print("\n🤖 Starting AI categorization...")
+        new, _ = pipelined_review(new)
+    else:
+        print("✅ Nothing new to categorize")
+    categorized = kept + new
     
     # Generate summary
     generate_summary(categorized)
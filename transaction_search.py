@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Search Transaction History
+
+    python transaction_search.py "merchant contains zomato AND amount > 500 AND category != Food"
+    python transaction_search.py "date >= 2024-04-01 AND date < 2024-05-01 AND type = Debit" --limit 50
+
+Clauses are joined with AND, alternatives with OR (AND binds tighter).
+Fields: merchant/desc (contains, not contains), amount and date
+(=, !=, >, >=, <, <=), category, type and verified (=, !=).
+"""
+
+import argparse
+import json
+import re
+from bisect import bisect_left, bisect_right
+from deduplicator import normalize_description, parse_date
+
+CLAUSE_PATTERN = re.compile(r'^\s*(\w+)\s+(not contains|contains|>=|<=|!=|=|>|<)\s+(.+?)\s*$', re.IGNORECASE)
+
+FIELD_ALIASES = {'merchant': 'desc', 'desc': 'desc', 'description': 'desc', 'amount': 'amount',
+                 'date': 'date', 'category': 'category', 'type': 'type', 'verified': 'verified'}
+
+class TransactionIndex:
+    """Inverted token index plus sorted amount and date indexes over a transaction list.
+
+    Rows are identified by their position in the list. Token lookups are
+    prefix matches on a sorted vocabulary and range clauses use bisect, so
+    a query touches only matching rows instead of scanning the history.
+    """
+
+    def __init__(self, transactions):
+        self.rows = transactions
+        self.postings = {}
+        self.keywords = {'category': {}, 'type': {}, 'verified': {}}
+        self.row_tokens = []
+        self.row_amounts = []
+        self.row_dates = []
+
+        for i, trans in enumerate(transactions):
+            tokens = normalize_description(trans.get('desc')).split()
+            self.row_tokens.append(tokens)
+            for token in set(tokens):
+                self.postings.setdefault(token, []).append(i)
+
+            self.row_amounts.append(float(trans.get('amount', 0)))
+            date = parse_date(trans.get('date'))
+            self.row_dates.append(date.toordinal() if date else None)
+
+            for field in self.keywords:
+                self.keywords[field].setdefault(keyword_value(field, trans.get(field, '')), set()).add(i)
+
+        self.vocabulary = sorted(self.postings)
+        self.amount_ids = sorted(range(len(transactions)), key=self.row_amounts.__getitem__)
+        self.amount_keys = [self.row_amounts[i] for i in self.amount_ids]
+        self.date_ids = sorted((i for i, d in enumerate(self.row_dates) if d is not None),
+                               key=self.row_dates.__getitem__)
+        self.date_keys = [self.row_dates[i] for i in self.date_ids]
+        self._all = None
+
+    def all_ids(self):
+        if self._all is None:
+            self._all = set(range(len(self.rows)))
+        return self._all
+
+    def token_range(self, word):
+        """Vocabulary slice of tokens starting with word"""
+        return self.vocabulary[bisect_left(self.vocabulary, word):bisect_left(self.vocabulary, word + '\uffff')]
+
+    def range_bounds(self, keys, op, value):
+        """(start, end) slice of a sorted index satisfying `key op value`, or the excluded slice for !="""
+        if op in ('=', '!='):
+            return bisect_left(keys, value), bisect_right(keys, value)
+        if op == '>':
+            return bisect_right(keys, value), len(keys)
+        if op == '>=':
+            return bisect_left(keys, value), len(keys)
+        if op == '<':
+            return 0, bisect_left(keys, value)
+        return 0, bisect_right(keys, value)
+
+    def estimate(self, field, op, value):
+        """Upper bound on rows matched by a clause, used to order evaluation"""
+        if field == 'desc':
+            if op == 'not contains':
+                return len(self.rows)
+            return min(sum(len(self.postings[t]) for t in self.token_range(word)) for word in value) if value else 0
+        if field in ('amount', 'date'):
+            keys = self.amount_keys if field == 'amount' else self.date_keys
+            start, end = self.range_bounds(keys, op, value)
+            return len(keys) - (end - start) if op == '!=' else end - start
+        size = len(self.keywords[field].get(value, ()))
+        return len(self.rows) - size if op == '!=' else size
+
+    def materialize(self, field, op, value):
+        """All row ids matching one clause"""
+        if field == 'desc':
+            ids = None
+            for word in value:
+                word_ids = set()
+                for token in self.token_range(word):
+                    word_ids.update(self.postings[token])
+                ids = word_ids if ids is None else ids & word_ids
+            ids = ids or set()
+            return self.all_ids() - ids if op == 'not contains' else ids
+        if field in ('amount', 'date'):
+            keys, ids = (self.amount_keys, self.amount_ids) if field == 'amount' else (self.date_keys, self.date_ids)
+            start, end = self.range_bounds(keys, op, value)
+            if op == '!=':
+                return set(ids[:start]) | set(ids[end:])
+            return set(ids[start:end])
+        ids = self.keywords[field].get(value, set())
+        return self.all_ids() - ids if op == '!=' else set(ids)
+
+    def row_matches(self, i, field, op, value):
+        """Check one clause against a single row"""
+        if field == 'desc':
+            found = all(any(token.startswith(word) for token in self.row_tokens[i]) for word in value)
+            return found != (op == 'not contains')
+        if field == 'amount' or field == 'date':
+            key = self.row_amounts[i] if field == 'amount' else self.row_dates[i]
+            if key is None:
+                return False
+            return {'=': key == value, '!=': key != value, '>': key > value,
+                    '>=': key >= value, '<': key < value, '<=': key <= value}[op]
+        matched = keyword_value(field, self.rows[i].get(field, '')) == value
+        return matched != (op == '!=')
+
+    def query(self, text):
+        """Return matching row ids for a query string.
+
+        The most selective clause is materialized from the indexes and the
+        remaining ones are checked row by row on that (small) candidate set.
+        """
+        result = set()
+        for alternative in re.split(r'\s+OR\s+', text.strip(), flags=re.IGNORECASE):
+            clauses = [parse_clause(clause) for clause in re.split(r'\s+AND\s+', alternative, flags=re.IGNORECASE)]
+            clauses.sort(key=lambda c: self.estimate(*c))
+            matches = self.materialize(*clauses[0])
+            for clause in clauses[1:]:
+                if not matches:
+                    break
+                if len(matches) <= self.estimate(*clause):
+                    matches = {i for i in matches if self.row_matches(i, *clause)}
+                else:
+                    matches &= self.materialize(*clause)
+            result |= matches
+        return result
+
+    def search(self, text, limit=None):
+        """Matching transactions, largest amount first"""
+        rows = sorted((self.rows[i] for i in self.query(text)), key=lambda t: t['amount'], reverse=True)
+        return rows[:limit] if limit else rows
+
+def keyword_value(field, value):
+    """Normalized value for category/type/verified lookups"""
+    if field == 'verified':
+        return str(value).lower() in ('true', 'yes', 'y', '1')
+    return str(value).lower()
+
+def parse_clause(clause):
+    """Parse 'field op value' into (field, op, value) with value converted for its index"""
+    match = CLAUSE_PATTERN.match(clause)
+    if not match:
+        raise ValueError(f"Cannot parse clause: {clause!r}")
+    field, op, value = match.groups()
+    if field.lower() not in FIELD_ALIASES:
+        raise ValueError(f"Unknown field {field!r}, expected one of: {', '.join(FIELD_ALIASES)}")
+    field, op, value = FIELD_ALIASES[field.lower()], op.lower(), value.strip('\'"')
+
+    if field == 'desc':
+        if op not in ('contains', 'not contains'):
+            raise ValueError(f"merchant supports 'contains' and 'not contains', not {op!r}")
+        words = tuple(normalize_description(value).split())
+        if not words:
+            # Digits and punctuation are stripped from descriptions, nothing would be left to match
+            raise ValueError(f"merchant search needs letters, {value!r} has none")
+        return field, op, words
+    if op in ('contains', 'not contains'):
+        raise ValueError(f"{field} does not support {op!r}")
+    if field == 'amount':
+        try:
+            return field, op, float(value)
+        except ValueError:
+            raise ValueError(f"Invalid amount: {value!r}")
+    if field == 'date':
+        date = parse_date(value)
+        if not date:
+            raise ValueError(f"Invalid date: {value!r}")
+        return field, op, date.toordinal()
+    if op not in ('=', '!='):
+        raise ValueError(f"{field} supports '=' and '!=', not {op!r}")
+    return field, op, keyword_value(field, value)
+
+def show_search_results(results, total):
+    print(f"\n🔍 {total} matching transactions")
+    print("=" * 70)
+    for trans in results:
+        status = "✅" if trans.get('verified') else "❓"
+        date = trans.get('date') or ''
+        print(f"{status} ₹{trans['amount']:>10.2f} {date:<10} {trans.get('category', ''):<13} - {trans['desc'][:40]}")
+    if total > len(results):
+        print(f"  ... and {total - len(results)} more")
+    if results:
+        print(f"\n💰 Total of shown: ₹{sum(t['amount'] for t in results):.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Search categorized transaction history")
+    parser.add_argument("query")
+    parser.add_argument("--file", default="categorized_transactions.json")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        with open(args.file, 'r') as f:
+            transactions = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ {args.file} not found. Run transaction_categorizer.py first.")
+        return
+
+    index = TransactionIndex(transactions)
+    try:
+        matches = index.search(args.query)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    show_search_results(matches[:args.limit], len(matches))
+
+if __name__ == "__main__":
+    main()